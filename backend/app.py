@@ -2,13 +2,50 @@
 noBG Backend - Flask API for background removal
 """
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 from PIL import Image
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import numpy as np
 import cv2
+import binascii
+import hashlib
 import io
+import json
+import multiprocessing
 import os
+import threading
+
+
+def _env_count(name, default):
+    """Read a positive integer from the environment, falling back to default."""
+    try:
+        return max(1, int(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+# Split the CPU cores between gunicorn workers (GUNICORN_WORKERS) so each
+# worker's pipeline processes get their own share instead of oversubscribing
+# the machine under concurrent requests
+GUNICORN_WORKERS = _env_count('GUNICORN_WORKERS', 1)
+WORKER_THREADS = max(1, (os.cpu_count() or 1) // GUNICORN_WORKERS)
+
+# Each worker runs PIPELINE_PROCESSES pipeline processes (default one per
+# core of its share) so concurrent requests are processed in parallel, and
+# each process gives its OpenCV/Numba thread pools PIPELINE_THREADS threads
+# (default the whole share) so a single request is not limited to one core
+PIPELINE_PROCESSES = _env_count('PIPELINE_PROCESSES', WORKER_THREADS)
+PIPELINE_THREADS = _env_count('PIPELINE_THREADS', WORKER_THREADS)
+cv2.setUseOptimized(True)
+os.environ.setdefault('NUMBA_NUM_THREADS', str(PIPELINE_THREADS))
+
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional; color-key falls back to OpenCV
+    njit = None
 
 app = Flask(__name__)
 CORS(app)
@@ -16,26 +53,153 @@ CORS(app)
 # Maximum file size (16MB)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
+# Edge detection and GrabCut run on a copy downscaled to at most this many
+# pixels on the long side; their cost grows faster than the pixel count
+EDGE_DETECT_MAX_SIDE = 1024
+
+# Rectangular structuring elements, built once at import
+_K3 = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+_K5 = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+_K9 = cv2.getStructuringElement(cv2.MORPH_RECT, (9, 9))
 
-def remove_background_edge_detect(image, threshold=50):
+# The decode/remove/encode pipeline runs in a bounded pool of worker
+# processes, so request threads only wait on results and CPU concurrency is
+# capped independently of how many connections are open. Started with the
+# web process; workers are spawned rather than forked, since forking after
+# OpenCV and Numba have started their thread pools is unsafe
+_executor = None
+_EXECUTOR_LOCK = threading.Lock()
+
+# Threads that fan batch uploads out to the process pool and wait on them
+_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+# Encoded results keyed by (upload digest, method, threshold, format), so
+# retries and repeated uploads skip the whole pipeline; least recently used
+# entries are evicted once the cache holds more than this many entries or
+# bytes. The cache is per gunicorn worker, so the size is kept small
+# (RESULT_CACHE_MB, default 32)
+RESULT_CACHE_MAX_ENTRIES = 128
+RESULT_CACHE_MAX_BYTES = _env_count('RESULT_CACHE_MB', 32) * 1024 * 1024
+_result_cache = OrderedDict()
+_result_cache_bytes = 0
+_RESULT_CACHE_LOCK = threading.Lock()
+
+
+if njit is not None:
+    @njit(cache=True, parallel=True, fastmath=True)
+    def _color_key_mask(img, bg_0, bg_1, bg_2, dist_sq, out):
+        """
+        Fused color-key kernel: 255 where squared color distance > dist_sq.
+        
+        Rows are spread over the process's PIPELINE_THREADS Numba threads.
+        """
+        h, w, _ = img.shape
+        for y in prange(h):
+            for x in range(w):
+                d0 = int(img[y, x, 0]) - bg_0
+                d1 = int(img[y, x, 1]) - bg_1
+                d2 = int(img[y, x, 2]) - bg_2
+                out[y, x] = 255 if d0 * d0 + d1 * d1 + d2 * d2 > dist_sq else 0
+else:
+    _color_key_mask = None
+
+
+def _decode_image(raw_bytes):
+    """
+    Decode an uploaded image file.
+    
+    JPEG/PNG/WebP/etc. are decoded by OpenCV (libjpeg-turbo/libpng);
+    formats OpenCV cannot read fall back to PIL.
+    
+    Args:
+        raw_bytes: Encoded image file contents
+    
+    Returns:
+        HxWx3 uint8 BGR array
+    
+    Raises:
+        Image.DecompressionBombError: If the image has more than twice
+            Image.MAX_IMAGE_PIXELS pixels
+    """
+    # PIL opens lazily and runs its decompression-bomb check on the header,
+    # so oversized images are rejected before any pixels are allocated
+    image = Image.open(io.BytesIO(raw_bytes))
+    
+    # Ignore the EXIF orientation tag, as PIL does, so the output orientation
+    # does not depend on which decoder ran
+    img_bgr = cv2.imdecode(
+        np.frombuffer(raw_bytes, dtype=np.uint8),
+        cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+    )
+    if img_bgr is None:
+        img_bgr = cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2BGR)
+    return img_bgr
+
+
+def _to_rgba(img_bgr, mask):
+    """
+    Attach an alpha mask to a BGR array.
+    
+    Copies channels straight into a preallocated RGBA buffer with
+    cv2.mixChannels, swapping B and R in the same pass and avoiding the
+    intermediate copies made by np.dstack.
+    
+    Args:
+        img_bgr: HxWx3 uint8 BGR array
+        mask: HxW uint8 alpha mask
+    
+    Returns:
+        HxWx4 uint8 RGBA array
+    """
+    rgba = np.empty((*mask.shape, 4), dtype=np.uint8)
+    cv2.mixChannels([img_bgr, mask], [rgba], [2, 0, 1, 1, 0, 2, 3, 3])
+    return rgba
+
+
+def _close_open(mask, kernel, merged_kernel):
+    """
+    Morphological close followed by open with a square kernel.
+    
+    close+open is dilate, erode, erode, dilate; the two middle erosions
+    collapse into one erosion with a (2k-1) square kernel, so this does
+    three passes over the mask instead of four with identical output.
+    
+    Args:
+        mask: HxW uint8 mask
+        kernel: kxk square structuring element
+        merged_kernel: (2k-1)x(2k-1) square structuring element
+    
+    Returns:
+        Cleaned HxW uint8 mask
+    """
+    mask = cv2.dilate(mask, kernel)
+    mask = cv2.erode(mask, merged_kernel)
+    return cv2.dilate(mask, kernel)
+
+
+def remove_background_edge_detect(img_bgr, threshold=50):
     """
     Remove background using edge detection and flood fill.
     
     Args:
-        image: PIL Image object
+        img_bgr: HxWx3 uint8 BGR array
         threshold: Sensitivity threshold (0-100)
     
     Returns:
         PIL Image with transparent background
     """
-    # Convert PIL to numpy array
-    img_array = np.array(image.convert('RGB'))
-    
-    # Convert to BGR for OpenCV
-    img_bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+    # Compute the mask on a downscaled copy of large images
+    full_h, full_w = img_bgr.shape[:2]
+    scale = min(1.0, EDGE_DETECT_MAX_SIDE / max(full_h, full_w))
+    if scale < 1.0:
+        # Explicit size so the short side of very thin images stays >= 1 px
+        dsize = (max(1, round(full_w * scale)), max(1, round(full_h * scale)))
+        work = cv2.resize(img_bgr, dsize, interpolation=cv2.INTER_AREA)
+    else:
+        work = img_bgr
     
     # Convert to grayscale
-    gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+    gray = cv2.cvtColor(work, cv2.COLOR_BGR2GRAY)
     
     # Apply Gaussian blur to reduce noise
     blurred = cv2.GaussianBlur(gray, (5, 5), 0)
@@ -47,140 +211,315 @@ def remove_background_edge_detect(image, threshold=50):
     edges = cv2.Canny(blurred, low_thresh, high_thresh)
     
     # Dilate edges to close gaps
-    kernel = np.ones((3, 3), np.uint8)
-    dilated = cv2.dilate(edges, kernel, iterations=2)
-    
-    # Find contours
-    contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    dilated = cv2.dilate(edges, _K3, iterations=2)
     
-    # Create mask
-    mask = np.zeros(gray.shape, dtype=np.uint8)
+    # Fill everything enclosed by the edges: flood the background from a
+    # one-pixel zero border (so it reaches around edges touching the image
+    # border), then keep every pixel the flood did not reach. Same result as
+    # filling the external contours, without a Python-level contour list
+    flood = cv2.copyMakeBorder(dilated, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    cv2.floodFill(flood, None, (0, 0), 128)
+    mask = cv2.compare(flood[1:-1, 1:-1], 128, cv2.CMP_NE)
     
-    if contours:
-        # Fill all contours
-        cv2.drawContours(mask, contours, -1, 255, -1)
-        
-        # Apply morphological operations to clean up
-        kernel = np.ones((5, 5), np.uint8)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+    # Apply morphological operations to clean up
+    mask = _close_open(mask, _K5, _K9)
     
     # If mask is mostly empty, use GrabCut as fallback
-    if np.sum(mask) < (mask.size * 0.01):  # Less than 1% of image
+    nonzero = cv2.countNonZero(mask)
+    if nonzero * 255 < mask.size * 0.01:  # Mask sum below 1% of the pixel count
         # Use GrabCut
-        mask = np.zeros(img_bgr.shape[:2], np.uint8)
         bgd_model = np.zeros((1, 65), np.float64)
         fgd_model = np.zeros((1, 65), np.float64)
         
-        # Define rectangle for GrabCut (slightly inset from edges)
-        h, w = img_bgr.shape[:2]
-        margin = int(min(h, w) * 0.05)
-        rect = (margin, margin, w - 2*margin, h - 2*margin)
+        if nonzero > 0:
+            # Warm-start from the partial edge mask instead of re-clustering
+            # from a rectangle; this converges in fewer iterations
+            gc_mask = np.where(mask > 0, cv2.GC_PR_FGD, cv2.GC_PR_BGD).astype(np.uint8)
+            rect = None
+            iterations, mode = 3, cv2.GC_INIT_WITH_MASK
+        else:
+            # Define rectangle for GrabCut (slightly inset from edges)
+            gc_mask = np.zeros(gray.shape, np.uint8)
+            h, w = gray.shape
+            margin = int(min(h, w) * 0.05)
+            rect = (margin, margin, w - 2*margin, h - 2*margin)
+            iterations, mode = 5, cv2.GC_INIT_WITH_RECT
         
         try:
-            cv2.grabCut(img_bgr, mask, rect, bgd_model, fgd_model, 5, cv2.GC_INIT_WITH_RECT)
-            mask = np.where((mask == 2) | (mask == 0), 0, 255).astype('uint8')
+            cv2.grabCut(work, gc_mask, rect, bgd_model, fgd_model, iterations, mode)
+            mask = np.where((gc_mask == 2) | (gc_mask == 0), 0, 255).astype('uint8')
         except:
             # If GrabCut fails, create a simple centered mask
             mask = np.zeros(gray.shape, dtype=np.uint8)
             h, w = mask.shape
             cv2.ellipse(mask, (w//2, h//2), (w//3, h//3), 0, 0, 360, 255, -1)
     
+    # Upsample the mask back to full resolution; bilinear leaves a soft
+    # edge instead of blocky steps
+    if scale < 1.0:
+        mask = cv2.resize(mask, (full_w, full_h), interpolation=cv2.INTER_LINEAR)
+    
     # Create RGBA image
-    rgba = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGBA)
-    rgba[:, :, 3] = mask
+    rgba = _to_rgba(img_bgr, mask)
     
     # Convert back to PIL
     result = Image.fromarray(rgba)
     return result
 
 
-def remove_background_color_key(image, threshold=50):
+def remove_background_color_key(img_bgr, threshold=50):
     """
     Remove background using color keying (chroma key style).
-    Detects the dominant corner color and removes similar colors.
+    Detects the dominant border color and removes similar colors.
     
     Args:
-        image: PIL Image object
+        img_bgr: HxWx3 uint8 BGR array
         threshold: Color similarity threshold (0-100)
     
     Returns:
         PIL Image with transparent background
     """
-    # Convert to numpy array
-    img_array = np.array(image.convert('RGB'))
-    
-    # Sample corner colors to detect background
-    h, w = img_array.shape[:2]
-    corners = [
-        img_array[0, 0],           # Top-left
-        img_array[0, w-1],         # Top-right
-        img_array[h-1, 0],         # Bottom-left
-        img_array[h-1, w-1]        # Bottom-right
-    ]
-    
-    # Use median of corners as background color
-    bg_color = np.median(corners, axis=0).astype(np.uint8)
-    
-    # Calculate color difference from background
-    diff = np.sqrt(np.sum((img_array.astype(np.float32) - bg_color.astype(np.float32)) ** 2, axis=2))
+    # Sample the one-pixel image border to detect background; unlike the
+    # four corners alone, a single object touching a corner cannot skew it
+    h, w = img_bgr.shape[:2]
+    border = np.concatenate([
+        img_bgr[0],                # Top row
+        img_bgr[h-1],              # Bottom row
+        img_bgr[1:h-1, 0],         # Left column
+        img_bgr[1:h-1, w-1]        # Right column
+    ])
+    
+    # Use median of the border as background color
+    bg_color = np.median(border, axis=0).astype(np.uint8)
     
     # Map threshold (0-100) to actual distance threshold
     # Higher threshold = more aggressive removal
     dist_threshold = (100 - threshold) * 2.55 + 10  # Range: 10-265
     
     # Create mask where foreground is white
-    mask = (diff > dist_threshold).astype(np.uint8) * 255
+    if _color_key_mask is not None:
+        # Single fused pass over the pixels; squared distances are integers,
+        # so comparing against the truncated squared threshold is exact
+        mask = np.empty((h, w), dtype=np.uint8)
+        _color_key_mask(img_bgr, int(bg_color[0]), int(bg_color[1]), int(bg_color[2]),
+                        int(dist_threshold ** 2), mask)
+    else:
+        # Per-channel color difference from background (uint8, SIMD); a
+        # scalar operand avoids materializing a full background image
+        diff = cv2.absdiff(img_bgr, tuple(int(c) for c in bg_color) + (0,))
+        
+        # Accumulate squared channel differences into one HxW buffer: the
+        # squared Euclidean distance, compared without a sqrt. Values are
+        # at most 3 * 255**2, so float32 holds them exactly
+        diff_sq = np.zeros((h, w), dtype=np.float32)
+        for channel in cv2.split(diff):
+            cv2.accumulateSquare(channel, diff_sq)
+        mask = cv2.compare(diff_sq, dist_threshold ** 2, cv2.CMP_GT)
     
     # Clean up mask with morphological operations
-    kernel = np.ones((3, 3), np.uint8)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+    mask = _close_open(mask, _K3, _K5)
     
     # Create RGBA image
-    rgba = np.dstack([img_array, mask])
+    rgba = _to_rgba(img_bgr, mask)
     
     result = Image.fromarray(rgba)
     return result
 
 
-def remove_background_luminance(image, threshold=50):
+def remove_background_luminance(img_bgr, threshold=50):
     """
     Remove background based on luminance/brightness.
     Good for images with light backgrounds.
     
     Args:
-        image: PIL Image object
+        img_bgr: HxWx3 uint8 BGR array
         threshold: Brightness threshold (0-100)
     
     Returns:
         PIL Image with transparent background
     """
-    # Convert to numpy array
-    img_array = np.array(image.convert('RGB'))
-    
     # Convert to grayscale for luminance
-    gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+    gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
     
     # Map threshold (0-100) to actual luminance threshold
     # Higher threshold = more aggressive (removes more light areas)
     lum_threshold = int(255 - (threshold * 2.55))
     
-    # Create mask where darker areas are kept
-    mask = (gray < lum_threshold).astype(np.uint8) * 255
+    # Create mask where darker areas are kept (gray < lum_threshold -> 255)
+    _, mask = cv2.threshold(gray, lum_threshold - 1, 255, cv2.THRESH_BINARY_INV)
     
     # Clean up mask
-    kernel = np.ones((3, 3), np.uint8)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+    mask = _close_open(mask, _K3, _K5)
     
     # Create RGBA image
-    rgba = np.dstack([img_array, mask])
+    rgba = _to_rgba(img_bgr, mask)
     
     result = Image.fromarray(rgba)
     return result
 
 
+def _accepts_webp():
+    """Check whether the request's Accept header explicitly lists image/webp."""
+    return any(
+        mimetype == 'image/webp' and quality > 0
+        for mimetype, quality in request.accept_mimetypes
+    )
+
+
+def _encode_result(result, fmt):
+    """
+    Encode a processed image.
+    
+    Args:
+        result: PIL Image with transparent background
+        fmt: 'PNG' or 'WEBP' (lossless, fastest method)
+    
+    Returns:
+        Encoded image bytes
+    """
+    buffer = io.BytesIO()
+    if fmt == 'WEBP':
+        result.save(buffer, format='WEBP', lossless=True, quality=0, method=0)
+    else:
+        result.save(buffer, format='PNG', compress_level=1, optimize=False)
+    return buffer.getvalue()
+
+
+def _process_bytes(raw_bytes, method, threshold, fmt):
+    """
+    Decode an upload, remove its background and encode the result.
+    
+    Runs in a worker process; only bytes cross the process boundary.
+    
+    Args:
+        raw_bytes: Encoded image file contents
+        method: Removal method ('edge-detect', 'color-key', 'luminance')
+        threshold: Removal threshold (0-100)
+        fmt: Output format, 'PNG' or 'WEBP'
+    
+    Returns:
+        Encoded image bytes
+    """
+    img_bgr = _decode_image(raw_bytes)
+    
+    # Apply background removal based on method
+    if method == 'color-key':
+        result = remove_background_color_key(img_bgr, threshold)
+    elif method == 'luminance':
+        result = remove_background_luminance(img_bgr, threshold)
+    else:  # Default to edge-detect
+        result = remove_background_edge_detect(img_bgr, threshold)
+    
+    return _encode_result(result, fmt)
+
+
+def _init_worker():
+    """Size a pipeline process's OpenCV thread pool and load the Numba kernel up front."""
+    cv2.setNumThreads(PIPELINE_THREADS)
+    if _color_key_mask is not None:
+        _color_key_mask(np.zeros((1, 1, 3), np.uint8), 0, 0, 0, 0, np.empty((1, 1), np.uint8))
+
+
+def _start_executor():
+    """Create the pipeline process pool and spawn all of its workers."""
+    executor = ProcessPoolExecutor(
+        max_workers=PIPELINE_PROCESSES,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker
+    )
+    # Workers are otherwise spawned on demand, and the first requests would
+    # wait for them to import OpenCV, NumPy and Numba
+    for _ in range(PIPELINE_PROCESSES):
+        executor.submit(os.getpid)
+    return executor
+
+
+def _get_executor():
+    """Return the pipeline process pool, starting it if needed."""
+    global _executor
+    with _EXECUTOR_LOCK:
+        if _executor is None:
+            _executor = _start_executor()
+    return _executor
+
+
+def _reset_executor(broken):
+    """Replace the pipeline process pool after a worker died, unless another thread already has."""
+    global _executor
+    with _EXECUTOR_LOCK:
+        if _executor is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            _executor = _start_executor()
+
+
+def _run_pipeline(raw_bytes, method, threshold, fmt):
+    """
+    Run _process_bytes on the worker process pool.
+    
+    A worker that dies (e.g. killed by the OOM killer) breaks the whole
+    pool. The pool is replaced for later requests, but the job is not
+    retried, since it may be the one that killed the worker.
+    
+    Returns:
+        Encoded image bytes
+    """
+    executor = _get_executor()
+    try:
+        return executor.submit(_process_bytes, raw_bytes, method, threshold, fmt).result()
+    except BrokenProcessPool:
+        _reset_executor(executor)
+        raise
+
+
+def _cache_result(key, data):
+    """Store an encoded result, evicting least recently used entries."""
+    global _result_cache_bytes
+    if len(data) > RESULT_CACHE_MAX_BYTES:
+        return
+    with _RESULT_CACHE_LOCK:
+        old = _result_cache.pop(key, None)
+        if old is not None:
+            _result_cache_bytes -= len(old)
+        _result_cache[key] = data
+        _result_cache_bytes += len(data)
+        while (_result_cache_bytes > RESULT_CACHE_MAX_BYTES
+               or len(_result_cache) > RESULT_CACHE_MAX_ENTRIES):
+            _, evicted = _result_cache.popitem(last=False)
+            _result_cache_bytes -= len(evicted)
+
+
+def _process_upload(raw_bytes, method, threshold, fmt='PNG'):
+    """
+    Process an upload on the worker process pool.
+    
+    Results are memoized on a digest of the upload contents, so identical
+    requests return the cached bytes without reprocessing.
+    
+    Args:
+        raw_bytes: Encoded image file contents
+        method: Removal method ('edge-detect', 'color-key', 'luminance')
+        threshold: Removal threshold (0-100)
+        fmt: Output format, 'PNG' or 'WEBP'
+    
+    Returns:
+        Encoded image bytes
+    """
+    # Unknown methods run edge-detect, so they share its cache entries
+    if method not in ('color-key', 'luminance'):
+        method = 'edge-detect'
+    
+    key = (hashlib.blake2b(raw_bytes, digest_size=16).digest(), method, threshold, fmt)
+    with _RESULT_CACHE_LOCK:
+        data = _result_cache.get(key)
+        if data is not None:
+            _result_cache.move_to_end(key)
+            return data
+    
+    data = _run_pipeline(raw_bytes, method, threshold, fmt)
+    _cache_result(key, data)
+    return data
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -198,7 +537,8 @@ def remove_background():
         - method: Removal method ('edge-detect', 'color-key', 'luminance')
     
     Returns:
-        PNG image with transparent background
+        PNG image with transparent background (lossless WebP if the
+        Accept header lists image/webp)
     """
     if 'image' not in request.files:
         return jsonify({'error': 'No image file provided'}), 400
@@ -217,36 +557,62 @@ def remove_background():
     method = request.form.get('method', 'edge-detect')
     
     try:
-        # Load image
-        image = Image.open(file.stream)
-        
-        # Convert to RGB if necessary (handle RGBA, palette, etc.)
-        if image.mode not in ('RGB', 'RGBA'):
-            image = image.convert('RGB')
+        # Lossless WebP when the client explicitly accepts it, PNG otherwise
+        if _accepts_webp():
+            fmt, mimetype = 'WEBP', 'image/webp'
+        else:
+            fmt, mimetype = 'PNG', 'image/png'
         
-        # Apply background removal based on method
-        if method == 'color-key':
-            result = remove_background_color_key(image, threshold)
-        elif method == 'luminance':
-            result = remove_background_luminance(image, threshold)
-        else:  # Default to edge-detect
-            result = remove_background_edge_detect(image, threshold)
+        output = io.BytesIO(_process_upload(file.read(), method, threshold, fmt))
         
-        # Save to bytes buffer
-        buffer = io.BytesIO()
-        result.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            mimetype='image/png',
+        response = send_file(
+            output,
+            mimetype=mimetype,
             as_attachment=False
         )
+        response.vary.add('Accept')
+        return response
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def _process_one(raw_bytes, method, threshold, filename, idx):
+    """
+    Process a single batch upload.
+    
+    Args:
+        raw_bytes: Encoded image file contents
+        method: Removal method
+        threshold: Removal threshold (0-100)
+        filename: Original upload filename
+        idx: Position of the upload in the batch
+    
+    Returns:
+        Result dict for the batch response
+    """
+    try:
+        data = _process_upload(raw_bytes, method, threshold)
+        
+        # Convert to base64
+        img_base64 = binascii.b2a_base64(data, newline=False).decode('ascii')
+        
+        return {
+            'index': idx,
+            'filename': filename,
+            'status': 'success',
+            'data': f'data:image/png;base64,{img_base64}'
+        }
+    
+    except Exception as e:
+        return {
+            'index': idx,
+            'filename': filename,
+            'status': 'error',
+            'error': str(e)
+        }
+
+
 @app.route('/api/batch-remove-background', methods=['POST'])
 def batch_remove_background():
     """
@@ -258,7 +624,7 @@ def batch_remove_background():
         - method: Removal method
     
     Returns:
-        JSON with processed image data (base64)
+        JSON with processed image data (base64), streamed one result at a time
     """
     if 'images[]' not in request.files:
         return jsonify({'error': 'No image files provided'}), 400
@@ -276,45 +642,35 @@ def batch_remove_background():
     
     method = request.form.get('method', 'edge-detect')
     
-    results = []
-    for i, file in enumerate(files):
-        try:
-            image = Image.open(file.stream)
-            
-            if image.mode not in ('RGB', 'RGBA'):
-                image = image.convert('RGB')
-            
-            if method == 'color-key':
-                result = remove_background_color_key(image, threshold)
-            elif method == 'luminance':
-                result = remove_background_luminance(image, threshold)
-            else:
-                result = remove_background_edge_detect(image, threshold)
-            
-            # Convert to base64
-            buffer = io.BytesIO()
-            result.save(buffer, format='PNG')
-            buffer.seek(0)
-            
-            import base64
-            img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            results.append({
-                'index': i,
-                'filename': file.filename,
-                'status': 'success',
-                'data': f'data:image/png;base64,{img_base64}'
-            })
-        
-        except Exception as e:
-            results.append({
-                'index': i,
-                'filename': file.filename,
-                'status': 'error',
-                'error': str(e)
-            })
-    
-    return jsonify({'results': results})
+    # Read every upload up front: request streams are not safe to share
+    # across worker threads
+    raw_files = [file.read() for file in files]
+    
+    # Results are yielded in upload order as they complete, so finished
+    # images are sent and released instead of building the whole response
+    results = _POOL.map(
+        _process_one,
+        raw_files,
+        [method] * len(files),
+        [threshold] * len(files),
+        [file.filename for file in files],
+        range(len(files))
+    )
+    
+    def generate():
+        yield '{"results": ['
+        for i, result in enumerate(results):
+            yield (', ' if i else '') + json.dumps(result)
+        yield ']}'
+    
+    return Response(generate(), mimetype='application/json')
+
+
+# Start the pipeline pool with the web process rather than on the first
+# request; the pool's own spawned workers import this module too and must
+# not start pools of their own
+if multiprocessing.current_process().name == 'MainProcess':
+    _get_executor()
 
 
 if __name__ == '__main__':